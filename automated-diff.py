@@ -22,6 +22,7 @@ For questions or suggestions, feel free to open an issue or contact me via [GitH
     
 hosts.txt must be named "hosts.txt".  The file must be located in the current directory and must be formatted in the following way:
     -one hostname or IP Address per line with no commas, quotes or spaces.
+    -blank lines and lines starting with '#' are ignored.
     
     -hosts.txt example:
 
@@ -30,34 +31,151 @@ hosts.txt must be named "hosts.txt".  The file must be located in the current di
 '''
 
 import os
+import errno
+import re
+import atexit
+import argparse
 import logging
-import difflib
+import logging.handlers
+import filecmp
+import json
 import paramiko
+import select
+import shutil
+import socket
+import subprocess
+import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from getpass import getpass
 
+# Optional C implementation of SequenceMatcher (pip install cdifflib); same results, much faster
+try:
+    from cdifflib import CSequenceMatcher as SequenceMatcher
+except ImportError:
+    from difflib import SequenceMatcher
+
 # Global separator for consistent formatting
 SEPARATOR = '-' * 60
-COMMAND_DELAY = 1  # Seconds / was 3
+COMMAND_TIMEOUT = 30  # Seconds of silence after which a command is considered stuck
+READY_TIMEOUT = 10  # Seconds to wait for the prompt during shell setup
+POLL_INTERVAL = 0.5  # Max seconds to block in select() before re-checking the deadline
+BANNER_QUIET = 0.3  # Seconds of silence that end the login banner/MOTD at shell start
+RECV_SIZE = 1 << 18  # 256 KiB per recv(); output is accumulated until the prompt returns
+WRITE_BUFFER_SIZE = 1 << 20  # 1 MiB; large outputs (show tech) are written in a few syscalls
+DIFF_TIMEOUT = 60  # Seconds allowed for the system diff on one file pair
+MAX_DIFF_LINES = 10000  # difflib output lines written per command before truncating
+SSH_KEEPALIVE = 30  # Seconds between keepalive packets on idle connections
+SSH_WINDOW_SIZE = 1 << 24  # 16 MiB per-channel window (paramiko default: 2 MiB); fewer flow-control stalls
+SSH_MAX_PACKET_SIZE = 1 << 18  # 256 KiB largest data packet we accept (paramiko default: 32 KiB)
+DEFAULT_WORKERS = 10  # Parallel SSH sessions, one per host; bounds load on this machine and on a --bastion
+PROBE_TIMEOUT = 3  # Seconds to wait for the SSH port to accept a TCP connection
+PROBE_WORKERS = 64  # Parallel DNS lookups and port probes; cheap, so wider than DEFAULT_WORKERS
+
+# Equipment menu choice -> command file
+DEVICE_FILES = {
+    "1": "C-ASR9K.txt",
+    "2": "C-CRS.txt",
+    "3": "CC_2960.txt",
+    "4": "CC_3850.txt",
+    "5": "CC_4500-X.txt",
+    "6": "CC_49xx.txt",
+    "7": "CC_65xx-76xx.txt",
+    "8": "C-Nexus 5xxx.txt",
+    "9": "C-Nexus 7xxx.txt",
+    "10": "C-Nexus 93xx-95xx.txt"
+}
+REQUIRED_FILES = frozenset(DEVICE_FILES.values()) | {"hosts.txt"}
+COMMANDS_FILE = ".commands.json"  # Pre-check command list, kept in the ticket directory
+
+# IOS-XR and NX-OS accept one-shot exec channels; Catalyst IOS needs an interactive shell
+EXEC_DEVICE_FILES = {
+    "C-ASR9K.txt",
+    "C-CRS.txt",
+    "C-Nexus 5xxx.txt",
+    "C-Nexus 7xxx.txt",
+    "C-Nexus 93xx-95xx.txt"
+}
 
 # Configure logging
+# healthcheck.log is rotated at 10 MiB (3 backups kept) and only created once something is logged
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s',
     handlers=[
-        logging.FileHandler("healthcheck.log"),
+        logging.handlers.RotatingFileHandler("healthcheck.log", maxBytes=10 << 20, backupCount=3, delay=True),
         logging.StreamHandler()
     ]
 )
 logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)  # Promoted to INFO by --verbose
+
+# GNU/BSD diff is used for the post-check comparison when available; difflib otherwise
+DIFF_BINARY = shutil.which("diff") if os.name != "nt" else None
+
+# Command text -> filename fragment, e.g. "show run | i host" -> "show_run__i_host"
+COMMAND_SAFE_TABLE = str.maketrans({" ": "_", "|": None, "/": "_"})
+
+# Generic device prompt (e.g. 'router#', 'switch>', 'RP/0/RSP0/CPU0:router#'), used until
+# the real prompt has been captured from the readiness marker output
+PROMPT_RE = re.compile(rb'[\r\n][\w.\-:/]+[#>]\s*$')
+# Confirmation question asked by e.g. `clear logging`
+CONFIRM_RE = re.compile(rb'\[confirm\]\s*$')
+# Pager shown when `term len 0` is missing from the command file; a space shows the next page
+MORE_RE = re.compile(rb'--More--\s*$')
+
+# Authenticated SSH clients keyed by (host, username), reused for the life of the process.
+# A paramiko Transport multiplexes channels safely across threads.
+_POOL = {}
+_POOL_LOCK = threading.Lock()
+
+# Static introduction shown at startup, written to stdout in a single call
+_BANNER = "\n".join([
+    "\nAutomated Pre and Post Health Check Script",
+    "=" * 80,
+    "\nThis script requires the following files in the current directory:",
+    '',
+    "         -`hosts.txt`:             - List of hosts (one per line).",
+    "         -`C_ASR9K.txt`:           - Cisco ASR9K",
+    "         -`C-CRS.txt`:             - Cisco CRS",
+    "         -`CC_2960.txt`:           - Cisco Catalyst 2960",
+    "         -`CC_3850.txt`:           - Cisco Catalyst 3850",
+    "         -`CC_4500-X.txt`:         - Cisco Catalyst 4500-X",
+    "         -`CC_49xx.txt`:           - Cisco Catalyst 49xx",
+    "         -`CC_65xx-76xx.txt`:      - Cisco Catalyst 65xx or 76xx",
+    "         -`C-Nexus 5xxx.txt`:      - Cisco Nexus 5xxx",
+    "         -`C-Nexus 7xxx.txt`:      - Cisco Nexus 7xxx",
+    "         -`C-Nexus 93xx-95xx.txt`: - Cisco Nexus 93xx/95xx",
+    '',
+    "\nEnsure all required files are present before proceeding.\n",
+    "=" * 80,
+    'Please NOTE:',
+    "=" * 80,
+    '',
+    "You can only use this for 'LIKE' devices, so ensure that hosts.txt only contains devices of a single 'type'",
+    'Healththeck and Pre-check output files of all commands are written to individual files with `.pre` extension (bunch of individual files)',
+    'Healthcheck and Post-check output files of all commands are written to individual files with `.post` extension (bunch of individual files)',
+    '',
+    "-" * 80,
+    'Consolidated output of all commands for Healtcheck and Pre-check is written to a single file (for each device) with `.precheck` extension',
+    'Consolidated output of all commands for Healtcheck and Post-check is written to a single file (for each device) with `.postcheck` extension',
+    '',
+    'Consolidated `diff` between Pre and Post Healthchecks as well as between Pre and Post checks is written to a file with `.out` extension (for each device)',
+    "-" * 80,
+    '',
+    "=" * 80
+]) + "\n"
 
-os.system('clear')
+# Clear the screen with an ANSI escape instead of spawning a shell for `clear`
+sys.stdout.write("\x1b[2J\x1b[H")
+sys.stdout.flush()
 
 def check_required_files(required_files):
     """
     Check if all required files exist in the current directory.
     """
-    missing_files = [file for file in required_files if not os.path.exists(file)]
+    missing_files = [file for file in required_files if not os.path.isfile(file)]
     if missing_files:
         print("\n[WARNING] The following required files are missing:")
         for file in missing_files:
@@ -66,112 +184,525 @@ def check_required_files(required_files):
         return False
     return True
 
-def ssh_command(host, username, password, commands, ticket_number, health_check_type):
+def resolve_host(host):
     """
-    Execute commands on a host via SSH and save output to separate files.
-    Additionally, create a consolidated .precheck or .postcheck file.
+    Return every TCP address of host for the SSH port, in resolver order, or [host] if it does not resolve.
+    """
+    try:
+        infos = socket.getaddrinfo(host, 22, proto=socket.IPPROTO_TCP)
+    except (OSError, UnicodeError) as e:  # UnicodeError: malformed name, e.g. 'a..b'
+        logger.warning("Could not resolve %s: %s", host, e)
+        return [host]
+    return list(dict.fromkeys(info[4][0] for info in infos))
+
+def ssh_port_open(address):
+    """
+    Return True if address accepts a TCP connection on the SSH port within PROBE_TIMEOUT seconds.
+    """
+    try:
+        socket.create_connection((address, 22), timeout=PROBE_TIMEOUT).close()
+        return True
+    except (OSError, UnicodeError):
+        return False
+
+def first_open_address(addresses):
+    """
+    Return the first of addresses whose SSH port is open, or None. A dual-stack device with
+    broken IPv6 is thus still reached over IPv4, as SSHClient.connect() would.
+    """
+    for address in addresses:
+        if ssh_port_open(address):
+            return address
+    return None
+
+def open_ssh_socket(address):
+    """
+    Open the TCP connection for an SSH session with Nagle's algorithm disabled, so short
+    sends (commands, pager keystrokes) go out immediately instead of waiting for an ACK.
+    Refused and unreachable connections raise NoValidConnectionsError, as SSHClient.connect() would.
     """
     try:
-        logger.info(f"Attempting to connect to {host}...")
-        ssh = paramiko.SSHClient()
-        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        ssh.connect(host, username=username, password=password, timeout=20)
-        logger.info(f"Successfully connected to {host}.")
+        sock = socket.create_connection((address, 22), timeout=20)
+    except OSError as e:
+        if e.errno in (errno.ECONNREFUSED, errno.EHOSTUNREACH):
+            raise paramiko.ssh_exception.NoValidConnectionsError({(address, 22): e})
+        raise
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    return sock
+
+def get_ssh_client(host, username, password, bastion=None, address=None):
+    """
+    Return a connected SSHClient for host, reusing a pooled connection when it is still active.
+    When bastion (a connected paramiko Transport) is given, the connection is tunnelled through it.
+    address is the pre-resolved IP of host; host is looked up again when it is not given.
+    """
+    key = (host, username)
+    with _POOL_LOCK:
+        ssh = _POOL.get(key)
+    if ssh is not None and ssh.get_transport() is not None and ssh.get_transport().is_active():
+        logger.info("Reusing existing SSH connection to %s.", host)
+        return ssh
+
+    logger.info("Attempting to connect to %s...", host)
+    ssh = paramiko.SSHClient()
+    ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    # Tunnel through the shared bastion connection rather than a new TCP connection and key exchange per host
+    if bastion is not None:
+        sock = bastion.open_channel("direct-tcpip", (host, 22), ("", 0))
+    else:
+        sock = open_ssh_socket(address or host)
+    # Password auth only: skip ssh-agent and ~/.ssh key probing, compress the verbose show output
+    try:
+        ssh.connect(
+            address or host, username=username, password=password, timeout=20,
+            banner_timeout=10, auth_timeout=10,
+            allow_agent=False, look_for_keys=False, compress=True, sock=sock
+        )
+    except BaseException:
+        # The client is not pooled yet, so nothing else would release the half-open session
+        ssh.close()
+        sock.close()
+        raise
+    # Keep pooled connections from being reaped by NAT/firewalls while idle
+    ssh.get_transport().set_keepalive(SSH_KEEPALIVE)
+    # Applies to every shell and exec channel opened on this connection from now on
+    ssh.get_transport().default_window_size = SSH_WINDOW_SIZE
+    ssh.get_transport().default_max_packet_size = SSH_MAX_PACKET_SIZE
+    logger.info("Successfully connected to %s.", host)
+    with _POOL_LOCK:
+        _POOL[key] = ssh
+    return ssh
+
+def connect_bastion(spec, username, password):
+    """
+    Connect to the jump host given as [user@]host; the SSH username is used when no user is given.
+    """
+    bastion_user, _, bastion_host = spec.rpartition("@")
+    logger.info("Connecting to bastion %s...", bastion_host)
+    bastion = paramiko.SSHClient()
+    bastion.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    bastion.connect(
+        bastion_host, username=bastion_user or username, password=password, timeout=20,
+        banner_timeout=10, auth_timeout=10,
+        allow_agent=False, look_for_keys=False
+    )
+    bastion.get_transport().set_keepalive(SSH_KEEPALIVE)
+    # The tunnel channels carry every device's output through the bastion
+    bastion.get_transport().default_window_size = SSH_WINDOW_SIZE
+    bastion.get_transport().default_max_packet_size = SSH_MAX_PACKET_SIZE
+    logger.info("Successfully connected to bastion %s.", bastion_host)
+    return bastion
+
+def discard_ssh_client(host, username):
+    """
+    Close and forget a pooled connection, e.g. after an error left it in an unknown state.
+    """
+    with _POOL_LOCK:
+        ssh = _POOL.pop((host, username), None)
+    if ssh is not None:
+        ssh.close()
+
+@atexit.register
+def close_ssh_pool():
+    """
+    Close every pooled SSH connection. Called once the SSH phase is over, and again at exit.
+    """
+    with _POOL_LOCK:
+        clients = list(_POOL.items())
+        _POOL.clear()
+    for (host, _), ssh in clients:
+        ssh.close()
+        logger.info("SSH session closed for %s.", host)
+
+def capture_prompt(readiness_output):
+    """
+    Return the device prompt (last non-empty line of the readiness marker output),
+    or None when the output does not end with something that looks like a prompt.
+    """
+    lines = [line.strip() for line in readiness_output.splitlines() if line.strip()]
+    if not lines or not PROMPT_RE.search(b"\n" + lines[-1].encode('utf-8')):
+        return None
+    return lines[-1]
+
+def build_prompt_re(prompt):
+    """
+    Build a regex matching the captured prompt at the end of the output.
+    Falls back to the generic PROMPT_RE when no prompt could be captured.
+    """
+    if prompt is None:
+        return PROMPT_RE
+    return re.compile(rb'[\r\n]' + re.escape(prompt.encode('utf-8')) + rb'\s*$')
+
+def prompt_or_confirm_re(prompt_re):
+    """
+    Extend a prompt regex so reading also stops at a [confirm] question.
+    """
+    return re.compile(prompt_re.pattern + rb'|' + CONFIRM_RE.pattern)
+
+def wait_for_data(ssh_shell, timeout):
+    """
+    Block until the channel has data or timeout seconds pass, without busy-waiting.
+    """
+    if ssh_shell.recv_ready():
+        return True
+    readable, _, _ = select.select([ssh_shell], [], [], timeout)
+    return bool(readable)
+
+class CappedOutput:
+    """
+    Accumulates command output as it is received. With keep_bytes set, only the first and last
+    keep_bytes bytes are held, so a huge output (e.g. show tech) is never in memory in full.
+    """
+
+    def __init__(self, keep_bytes=0):
+        self.keep_bytes = keep_bytes
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.dropped = 0
+
+    def extend(self, chunk):
+        if not self.keep_bytes:
+            self.head += chunk
+            return
+        room = self.keep_bytes - len(self.head)
+        if room > 0:
+            self.head += chunk[:room]
+            chunk = chunk[room:]
+        self.tail += chunk
+        excess = len(self.tail) - self.keep_bytes
+        if excess > 0:
+            del self.tail[:excess]
+            self.dropped += excess
 
-        # Open an interactive shell session
-        ssh_shell = ssh.invoke_shell()
-        ssh_shell.settimeout(30)  # Timeout for shell interactions
+    def recent(self, size):
+        """
+        Return the last size bytes received (fewer if less has been kept), e.g. for prompt matching.
+        """
+        if size <= 0:
+            return b""
+        if len(self.tail) >= size:
+            return bytes(self.tail[-size:])
+        return bytes(self.head[-(size - len(self.tail)):] + self.tail)
 
+    def getvalue(self):
+        """
+        Return the kept output, with a marker where bytes were dropped.
+        """
+        if not self.dropped:
+            return bytes(self.head + self.tail)
+        return b"".join((self.head, b"\n...[TRUNCATED %d BYTES]...\n" % self.dropped, self.tail))
+
+def drain_banner(ssh_shell):
+    """
+    Discard the login banner/MOTD of a new shell: wait for the first output, then read until the
+    generic prompt appears or the device has been quiet for BANNER_QUIET seconds.
+    """
+    if not wait_for_data(ssh_shell, READY_TIMEOUT):
+        return
+    tail = b""
+    while wait_for_data(ssh_shell, BANNER_QUIET):
+        chunk = ssh_shell.recv(RECV_SIZE)
+        if not chunk:
+            return
+        tail = (tail + chunk)[-256:]
+        if PROMPT_RE.search(tail):
+            return
+
+def read_until_prompt(ssh_shell, host, prompt_re, timeout=COMMAND_TIMEOUT, keep_bytes=0):
+    """
+    Read from the shell until the device prompt reappears or the device has been idle for timeout seconds.
+    A --More-- pager is answered with a space so paged output is not mistaken for a stuck command.
+    Returns the raw bytes; output of any size is drained; nothing is truncated at the recv() buffer size, and a
+    long-running command that keeps streaming (e.g. show tech) is never cut off.
+    With keep_bytes set, only the first and last keep_bytes bytes are kept (see CappedOutput).
+    """
+    buf = CappedOutput(keep_bytes)
+    received = 0
+    answered_at = 0  # Bytes received when the last pager was answered
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            logger.warning("[%s] No output for %ss while waiting for the device prompt.", host, timeout)
+            break
+        if not wait_for_data(ssh_shell, min(remaining, POLL_INTERVAL)):
+            continue
+        chunk = ssh_shell.recv(RECV_SIZE)
+        if not chunk:
+            logger.warning("[%s] Shell channel closed before the device prompt returned.", host)
+            break
+        buf.extend(chunk)
+        received += len(chunk)
+        deadline = time.monotonic() + timeout  # Device is still sending
+        # Only the tail can contain the prompt
+        if prompt_re.search(buf.recent(256)):
+            break
+        # A pager that was already answered stays in the buffer; only look at what arrived since
+        if MORE_RE.search(buf.recent(min(256, received - answered_at))):
+            ssh_shell.send(" ")
+            answered_at = received
+    if buf.dropped:
+        logger.warning("[%s] Output exceeded %s bytes; dropped %s bytes from the middle.",
+                       host, 2 * keep_bytes, buf.dropped)
+    return buf.getvalue()
+
+def run_pipelined_commands(ssh_shell, host, commands, prompt, keep_bytes=0):
+    """
+    Send all commands in a single batch and split the captured stream on the device prompt.
+    Each segment starts with the echoed command, so outputs match the one-at-a-time mode.
+    The whole batch is held in memory until it has been split; keep_bytes then caps each segment.
+    Returns a list of (command, output) pairs, or None if the output is paged: the typed-ahead
+    commands have then been consumed by the --More-- pager and must be sent one at a time.
+    """
+    prompt_bytes = prompt.encode('utf-8')
+    split_re = re.compile(rb'(?<=[\r\n])' + re.escape(prompt_bytes))
+
+    logger.info("[%s] Sending %s commands in one batch.", host, len(commands))
+    ssh_shell.send("\n".join(commands) + "\n")
+
+    # One prompt is printed after every command; wait until all of them have arrived
+    buf = bytearray()
+    found = 0
+    scan_pos = 0
+    deadline = time.monotonic() + COMMAND_TIMEOUT
+    while found < len(commands) and time.monotonic() < deadline:
+        if not wait_for_data(ssh_shell, POLL_INTERVAL):
+            continue
+        chunk = ssh_shell.recv(RECV_SIZE)
+        if not chunk:
+            break
+        buf.extend(chunk)
+        deadline = time.monotonic() + COMMAND_TIMEOUT  # Device is still sending
+        if b"--More--" in buf[max(0, len(buf) - len(chunk) - 8):]:
+            return None
+        for match in split_re.finditer(buf, scan_pos):
+            found += 1
+            scan_pos = match.end()
+    if found < len(commands):
+        logger.warning("[%s] Timed out after %s of %s commands in the batch.", host, found, len(commands))
+
+    segments = split_re.split(buf)
+    results = []
+    for index, command in enumerate(commands):
+        segment = bytes(segments[index]) if index < len(segments) else b""
+        if index < found:
+            segment += prompt_bytes
+        if keep_bytes:
+            capped = CappedOutput(keep_bytes)
+            capped.extend(segment)
+            if capped.dropped:
+                logger.warning("[%s] Output of %s exceeded %s bytes; dropped %s bytes from the middle.",
+                               host, command, 2 * keep_bytes, capped.dropped)
+            segment = capped.getvalue()
+        results.append((command, segment))
+    return results
+
+def open_shell(ssh, host):
+    """
+    Open an interactive shell, read past the login banner and capture the device prompt.
+    Returns (ssh_shell, prompt, prompt_re); prompt is None when it could not be captured.
+    """
+    # Open an interactive shell session
+    ssh_shell = ssh.invoke_shell()
+    ssh_shell.settimeout(30)  # Timeout for shell interactions
+
+    try:
         # Check if the shell is active
         if not ssh_shell.active:
             raise RuntimeError("SSH shell session is not active.")
 
-        # Add a delay to ensure the shell is ready
-        time.sleep(1)  # Initial delay for shell readiness / was 5
-        while ssh_shell.recv_ready():  # Flush any residual output
-            ssh_shell.recv(65535)
-
-        # Send a marker command to confirm readiness
-        logger.info(f"[{host}] Sending readiness marker.")
-        ssh_shell.send("\n\n\n")  # Send 3x newlines to clear and prepare the shell
-        time.sleep(0.5) # was 2
-        while ssh_shell.recv_ready():
-            readiness_output = ssh_shell.recv(65535).decode('utf-8')
-        logger.info(f"[{host}] Readiness marker output: {readiness_output}")
-
-        # Clear the logging buffer
-        logger.info(f"[{host}] Clearing logging buffer.")
-        ssh_shell.send("\n\n\nclear logging\n\n\n")  # Send 3x newlines before and after the command
-        time.sleep(1) # was 2
-        while ssh_shell.recv_ready():
-            ssh_shell.recv(65535)
+        # Returns as soon as the banner has been read instead of sleeping a fixed time
+        drain_banner(ssh_shell)
 
-        # Create consolidated output file
-        consolidated_file = None
-        if health_check_type == "pre":
-            consolidated_file = os.path.join(ticket_number, f"{host}.precheck")
-        elif health_check_type == "post":
-            consolidated_file = os.path.join(ticket_number, f"{host}.postcheck")
+        # Send a marker newline and block until the prompt answers it
+        logger.info("[%s] Sending readiness marker.", host)
+        ssh_shell.send("\n")
+        readiness_output = read_until_prompt(ssh_shell, host, PROMPT_RE, timeout=READY_TIMEOUT)
+        readiness_output = readiness_output.decode('utf-8', errors='replace')
+        logger.info("[%s] Readiness marker output: %s", host, readiness_output)
+        prompt = capture_prompt(readiness_output)
+        prompt_re = build_prompt_re(prompt)
+        logger.info("[%s] Using prompt pattern: %r", host, prompt_re.pattern)
+    except BaseException:
+        ssh_shell.close()
+        raise
+    return ssh_shell, prompt, prompt_re
 
-        if consolidated_file:
-            logger.info(f"Consolidated file will be created: {consolidated_file}")
+def run_shell_commands(ssh, host, commands, pipeline=False, keep_bytes=0):
+    """
+    Run commands over a single interactive shell and yield (command, raw output bytes) pairs.
+    Required for devices (e.g. Catalyst IOS) that do not accept exec channels.
+    """
+    ssh_shell, prompt, prompt_re = open_shell(ssh, host)
 
-        # Execute commands
-        for index, command in enumerate(commands):
+    try:
+        # Clear the logging buffer, answering the [confirm] question if the device asks it
+        logger.info("[%s] Clearing logging buffer.", host)
+        ssh_shell.send("clear logging\n")
+        clear_output = read_until_prompt(ssh_shell, host, prompt_or_confirm_re(prompt_re), timeout=READY_TIMEOUT)
+        if CONFIRM_RE.search(clear_output):
+            ssh_shell.send("\n")
+            read_until_prompt(ssh_shell, host, prompt_re, timeout=READY_TIMEOUT)
+
+        # Batching needs the exact prompt to split the output back into commands
+        if pipeline and prompt is not None:
+            results = run_pipelined_commands(ssh_shell, host, commands, prompt, keep_bytes)
+            if results is not None:
+                yield from results
+                return
+            logger.warning("[%s] Output is paged (--More--); sending commands one at a time.", host)
+            # The pager has eaten part of the batch and the shell state is unknown; start over on a new shell
+            ssh_shell.close()
+            ssh_shell, prompt, prompt_re = open_shell(ssh, host)
+        elif pipeline:
+            logger.warning("[%s] Could not capture the device prompt; sending commands one at a time.", host)
+
+        for command in commands:
             # Add a blank line for clarity in the screen log
             logger.info("------------------------------------------------------------")
-            logger.info(f"[{host}] Preparing to run command: {command}")
+            logger.info("[%s] Preparing to run command: %s", host, command)
 
             # Explicitly flush the input buffer
             while ssh_shell.recv_ready():
-                ssh_shell.recv(65535)
+                ssh_shell.recv(RECV_SIZE)
 
-            # Send 3x newlines before the command
-            ssh_shell.send("\n\n\n")
-            time.sleep(0.1)
+            # Send a single newline so exactly one prompt marks the end of the output
+            ssh_shell.send(command + "\n")
+            logger.debug("[%s] Command sent: %s", host, command)
 
-            # Send the command and 3x newlines after
-            ssh_shell.send(command + "\n\n\n")
-            logger.debug(f"[{host}] Command sent: {command}")
+            # Retrieve the output as soon as the prompt returns
+            yield command, read_until_prompt(ssh_shell, host, prompt_re, keep_bytes=keep_bytes)
+    finally:
+        # Pooled connections outlive the shell, so close the channel explicitly
+        ssh_shell.close()
 
-            # Add an additional delay for the first command
-            if index == 0:
-                time.sleep(COMMAND_DELAY + 3) # was 5.0
-            else:
-                time.sleep(COMMAND_DELAY + 2) # was 2.0
-
-            # Retrieve the output
-            output = ""
-            if ssh_shell.recv_ready():
-                while ssh_shell.recv_ready():
-                    output += ssh_shell.recv(65535).decode('utf-8')
-
-            # Ensure output is logged even if empty
-            if not output.strip():
-                logger.warning(f"[{host}] No output received for command: {command}")
-                output = "[INFO] No output received."
-
-            # Write each command's output to a separate file
-            command_safe = command.replace(' ', '_').replace('|', '').replace('/', '_')
-            output_file = os.path.join(ticket_number, f"{host}-{command_safe}.{health_check_type}")
+def run_exec_commands(ssh, host, commands, keep_bytes=0):
+    """
+    Run each command on its own exec channel and yield (command, raw output bytes) pairs.
+    The channel closes when the command completes, so no prompt detection is needed.
+    keep_bytes caps each output while it is read (see CappedOutput).
+    """
+    # Clear the logging buffer; the newline answers the [confirm] prompt.
+    # A device that rejects it or asks something else must not fail the host.
+    logger.info("[%s] Clearing logging buffer.", host)
+    try:
+        stdin, stdout, _ = ssh.exec_command("clear logging", timeout=COMMAND_TIMEOUT)
+        stdin.write("\n")
+        stdin.flush()
+        stdout.read()
+    except (OSError, paramiko.SSHException) as e:
+        logger.warning("[%s] Could not clear the logging buffer: %s. Continuing with the commands.", host, e)
+
+    for command in commands:
+        # Add a blank line for clarity in the screen log
+        logger.info("------------------------------------------------------------")
+        logger.info("[%s] Preparing to run command: %s", host, command)
+
+        _, stdout, stderr = ssh.exec_command(command, timeout=COMMAND_TIMEOUT)
+        logger.debug("[%s] Command sent: %s", host, command)
+        output = CappedOutput(keep_bytes)
+        try:
+            for stream in (stdout, stderr):
+                while True:
+                    chunk = stream.read(RECV_SIZE)
+                    if not chunk:
+                        break
+                    output.extend(chunk)
+        except socket.timeout:
+            # A stalled command only costs its own output; the session is still usable for the rest
+            logger.warning("[%s] No output for %ss from %s; keeping the partial output.",
+                           host, COMMAND_TIMEOUT, command)
+            stdout.channel.close()
+        if output.dropped:
+            logger.warning("[%s] Output of %s exceeded %s bytes; dropped %s bytes from the middle.",
+                           host, command, 2 * keep_bytes, output.dropped)
+        yield command, output.getvalue()
+
+def write_file_bytes(path, data):
+    """
+    Write data to path with raw os.write() calls, bypassing Python's text and buffer layers.
+    Used for files that are written once in full and never re-read by this process.
+    """
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            written = os.write(fd, view)
+            view = view[written:]
+    finally:
+        os.close(fd)
+
+def ssh_command(host, username, password, cmd_pairs, ticket_number, health_check_type, use_exec=False, pipeline=False,
+                bastion=None, keep_bytes=0, address=None):
+    """
+    Execute commands on a host via SSH and save output to separate files.
+    Additionally, create a consolidated .precheck or .postcheck file.
+    cmd_pairs is a tuple of (command, filename-safe command) pairs built once in main().
+    bastion is the shared jump host Transport, or None to connect directly.
+    keep_bytes, when non-zero, limits each output to its first and last keep_bytes bytes while it is read.
+    address is the first IP of host that answered the probe in main(), or None to let the connect resolve it.
+    """
+    commands = [command for command, _ in cmd_pairs]
+    safe_names = dict(cmd_pairs)
+    # Joined once; per-command paths are then plain string concatenation
+    file_prefix = os.path.join(ticket_number, f"{host}-")
+    try:
+        ssh = get_ssh_client(host, username, password, bastion, address)
+
+        # Create consolidated output file
+        consolidated_file = None
+        if health_check_type == "pre":
+            consolidated_file = os.path.join(ticket_number, f"{host}.precheck")
+        elif health_check_type == "post":
+            consolidated_file = os.path.join(ticket_number, f"{host}.postcheck")
+
+        # Open the consolidated file once and stream each command's output into it
+        consolidated = None
+        if consolidated_file:
             try:
-                with open(output_file, "w") as out:
-                    out.write(output)
-                logger.info(f"[{host}] Output written to {output_file}")
+                consolidated = open(consolidated_file, "wb", buffering=WRITE_BUFFER_SIZE)
+                logger.info("Consolidated file will be created: %s", consolidated_file)
             except IOError as e:
-                logger.error(f"[{host}] Failed to write output file: {output_file}. Error: {e}")
+                logger.error("[%s] Failed to create consolidated file: %s. Error: %s", host, consolidated_file, e)
+
+        # Execute commands
+        if use_exec:
+            logger.info("[%s] Running commands over exec channels.", host)
+            results = run_exec_commands(ssh, host, commands, keep_bytes)
+        else:
+            logger.info("[%s] Running commands over an interactive shell.", host)
+            results = run_shell_commands(ssh, host, commands, pipeline, keep_bytes)
+
+        try:
+            for command, output in results:
+                # Ensure output is logged even if empty
+                if not output.strip():
+                    logger.warning("[%s] No output received for command: %s", host, command)
+                    output = b"[INFO] No output received."
 
-            # Append to consolidated output file
-            if consolidated_file:
+                # Write each command's output to a separate file
+                command_safe = safe_names[command]
+                output_file = f"{file_prefix}{command_safe}.{health_check_type}"
                 try:
-                    with open(consolidated_file, "a") as consolidated:
-                        consolidated.write(f"Command: {command}\n{output}\n{SEPARATOR}\n")
-                    logger.info(f"[{host}] Command output appended to {consolidated_file}.")
+                    write_file_bytes(output_file, output)
+                    logger.info("[%s] Output written to %s", host, output_file)
                 except IOError as e:
-                    logger.error(f"[{host}] Failed to write to consolidated file: {consolidated_file}. Error: {e}")
+                    logger.error("[%s] Failed to write output file: %s. Error: %s", host, output_file, e)
 
-        ssh.close()
-        logger.info(f"SSH session closed for {host}.")
+                # Append to consolidated output file
+                if consolidated:
+                    try:
+                        consolidated.write(f"Command: {command}\n".encode('utf-8'))
+                        consolidated.write(output)
+                        consolidated.write(f"\n{SEPARATOR}\n".encode('utf-8'))
+                        logger.info("[%s] Command output appended to %s.", host, consolidated_file)
+                    except IOError as e:
+                        logger.error("[%s] Failed to write to consolidated file: %s. Error: %s", host, consolidated_file, e)
+        finally:
+            if consolidated:
+                consolidated.close()
+
+        # The connection stays in the pool and is closed by close_ssh_pool() at exit
         return None  # No errors
 
     except paramiko.ssh_exception.AuthenticationException:
@@ -181,42 +712,339 @@ def ssh_command(host, username, password, commands, ticket_number, health_check_
         return "[ERROR] Unable to connect to host. Check if the device is reachable."
 
     except Exception as e:
+        discard_ssh_client(host, username)
         return f"[ERROR] {e}"
 
+def format_range_unified(start, stop):
+    """
+    Convert a SequenceMatcher range to the 'start,length' form used in unified diff hunk headers.
+    """
+    beginning = start + 1
+    length = stop - start
+    if length == 1:
+        return f"{beginning}"
+    if not length:
+        beginning -= 1
+    return f"{beginning},{length}"
+
+def common_affix_lengths(pre_lines, post_lines):
+    """
+    Return the number of identical leading and trailing lines shared by both lists.
+    """
+    limit = min(len(pre_lines), len(post_lines))
+    prefix = 0
+    while prefix < limit and pre_lines[prefix] == post_lines[prefix]:
+        prefix += 1
+    limit -= prefix
+    suffix = 0
+    while suffix < limit and pre_lines[-1 - suffix] == post_lines[-1 - suffix]:
+        suffix += 1
+    return prefix, suffix
+
+def group_opcodes(codes, n=3):
+    """
+    Split opcodes into hunks with n lines of context, as SequenceMatcher.get_grouped_opcodes() does.
+    """
+    if not codes:
+        return
+    if codes[0][0] == "equal":
+        tag, i1, i2, j1, j2 = codes[0]
+        codes[0] = tag, max(i1, i2 - n), i2, max(j1, j2 - n), j2
+    if codes[-1][0] == "equal":
+        tag, i1, i2, j1, j2 = codes[-1]
+        codes[-1] = tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)
+
+    group = []
+    for tag, i1, i2, j1, j2 in codes:
+        # A long run of equal lines ends one hunk and starts the next
+        if tag == "equal" and i2 - i1 > n + n:
+            group.append((tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)))
+            yield group
+            group = []
+            i1, j1 = max(i1, i2 - n), max(j1, j2 - n)
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == "equal"):
+        yield group
+
+def unified_diff_bytes(pre_lines, post_lines, fromfile, tofile, n=3):
+    """
+    Yield a unified diff in the same format as difflib.diff_bytes(difflib.unified_diff, ...).
+    The unchanged head and tail (banner, most of the config) are stripped before matching, as
+    GNU diff does, so SequenceMatcher only sees the changed middle. It runs on per-line hashes,
+    so its comparisons are int equality; the original lines are looked up when rendering hunks.
+    """
+    prefix, suffix = common_affix_lengths(pre_lines, post_lines)
+    pre_end = len(pre_lines) - suffix
+    post_end = len(post_lines) - suffix
+    matcher = SequenceMatcher(
+        None,
+        [hash(line) for line in pre_lines[prefix:pre_end]],
+        [hash(line) for line in post_lines[prefix:post_end]]
+    )
+
+    # Shift the middle opcodes back to absolute line numbers and restore the trimmed context
+    codes = [(tag, i1 + prefix, i2 + prefix, j1 + prefix, j2 + prefix) for tag, i1, i2, j1, j2 in matcher.get_opcodes()]
+    if prefix:
+        codes.insert(0, ("equal", 0, prefix, 0, prefix))
+    if suffix:
+        codes.append(("equal", pre_end, len(pre_lines), post_end, len(post_lines)))
+
+    started = False
+    for group in group_opcodes(codes, n):
+        if not started:
+            started = True
+            yield b"--- " + fromfile + b"\n"
+            yield b"+++ " + tofile + b"\n"
+
+        first, last = group[0], group[-1]
+        pre_range = format_range_unified(first[1], last[2])
+        post_range = format_range_unified(first[3], last[4])
+        yield f"@@ -{pre_range} +{post_range} @@\n".encode('ascii')
+
+        for tag, i1, i2, j1, j2 in group:
+            if tag == "equal":
+                for line in pre_lines[i1:i2]:
+                    yield b" " + line
+                continue
+            if tag in ("replace", "delete"):
+                for line in pre_lines[i1:i2]:
+                    yield b"-" + line
+            if tag in ("replace", "insert"):
+                for line in post_lines[j1:j2]:
+                    yield b"+" + line
+
+def system_diff(pre_file, post_file, diff_out):
+    """
+    Stream `diff -a -u` of two files straight into diff_out.
+    -a treats device output containing NUL bytes as text instead of reporting "Binary files differ".
+    Returns False when the system diff is unavailable or fails, so the caller can fall back to difflib.
+    """
+    if DIFF_BINARY is None:
+        return False
+    diff_out.flush()  # diff writes to the underlying descriptor, after anything already buffered
+    try:
+        result = subprocess.run(
+            [DIFF_BINARY, "-a", "-u", "--label", pre_file, "--label", post_file, "--", pre_file, post_file],
+            stdout=diff_out.fileno(), stderr=subprocess.PIPE, timeout=DIFF_TIMEOUT
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logger.warning("System diff failed for %s: %s. Falling back to difflib.", pre_file, e)
+        return False
+    # Exit status 0 = identical, 1 = differences found, 2 = trouble
+    if result.returncode > 1:
+        error = result.stderr.decode('utf-8', errors='replace').strip()
+        logger.warning("System diff failed for %s: %s. Falling back to difflib.", pre_file, error)
+        return False
+    return True
+
+def list_ticket_files(ticket_number):
+    """
+    Return the names of all files in the ticket directory, read in a single directory scan.
+    """
+    with os.scandir(ticket_number) as entries:
+        return {entry.name for entry in entries if entry.is_file()}
+
+def diff_host(host, cmd_pairs, ticket_number, present_files):
+    """
+    Compare the .pre and .post output of every command for a host and save a consolidated .out file.
+    The diff is computed on raw bytes and streamed to disk as it is generated.
+    Only changed commands get a section; unchanged ones are listed together at the end.
+    present_files is the set of filenames in the ticket directory (see list_ticket_files()).
+    """
+    diff_output_file = os.path.join(ticket_number, f"{host}.out")
+    dir_prefix = os.path.join(ticket_number, "")
+    with open(diff_output_file, "wb", buffering=WRITE_BUFFER_SIZE) as diff_out:
+        logger.info("Starting diff for host %s, output will be saved to %s", host, diff_output_file)
+        unchanged = []
+        for command, command_safe in cmd_pairs:
+            pre_name = f"{host}-{command_safe}.pre"
+            post_name = f"{host}-{command_safe}.post"
+            pre_file = dir_prefix + pre_name
+            post_file = dir_prefix + post_name
+
+            if pre_name not in present_files:
+                logger.warning("%s not found for %s. Skipping diff.", pre_file, host)
+                diff_out.write(f"{command} - [WARNING] Pre file not found.\n{SEPARATOR}\n".encode('utf-8'))
+                continue
+
+            if post_name not in present_files:
+                logger.warning("%s not found for %s. Skipping diff.", post_file, host)
+                diff_out.write(f"{command} - [WARNING] Post file not found.\n{SEPARATOR}\n".encode('utf-8'))
+                continue
+
+            # Most outputs are unchanged; a byte comparison is far cheaper than difflib
+            if filecmp.cmp(pre_file, post_file, shallow=False):
+                unchanged.append(command)
+                continue
+
+            diff_out.write(f"Command: {command}\n".encode('utf-8'))
+
+            # GNU diff is C and streams; difflib remains the fallback (e.g. on Windows)
+            if system_diff(pre_file, post_file, diff_out):
+                diff_out.write(f"\n{SEPARATOR}\n".encode('utf-8'))
+                continue
+
+            with open(pre_file, "rb") as pre, open(post_file, "rb") as post:
+                pre_lines = pre.readlines()
+                post_lines = post.readlines()
+
+            # Stream the diff and stop at MAX_DIFF_LINES, e.g. after a reload changed everything
+            line_count = 0
+            diff = unified_diff_bytes(pre_lines, post_lines, os.fsencode(pre_file), os.fsencode(post_file))
+            for line in diff:
+                if line_count == MAX_DIFF_LINES:
+                    logger.warning("[%s] Diff for %s truncated at %s lines.", host, command, MAX_DIFF_LINES)
+                    diff_out.write(f"\n[WARNING] Diff truncated after {MAX_DIFF_LINES} lines.\n".encode('utf-8'))
+                    break
+                line_count += 1
+                diff_out.write(line)
+            if not line_count:
+                diff_out.write(b"[INFO] No differences detected.\n")
+            diff_out.write(f"\n{SEPARATOR}\n".encode('utf-8'))
+
+        if unchanged:
+            summary = [f"[INFO] No differences detected in {len(unchanged)} commands:"]
+            summary += [f" - {command}" for command in unchanged]
+            diff_out.write(("\n".join(summary) + f"\n{SEPARATOR}\n").encode('utf-8'))
+    logger.info("Diff results for host %s saved to %s", host, diff_output_file)
+
+def select_commands():
+    """
+    Ask for the equipment type and read its command file.
+    Returns (device_file, commands), or None if the choice or the file is invalid.
+    """
+    # Equipment type selection
+    sys.stdout.write("\n".join([
+        "\nSelect the equipment type:",
+        " 1. Cisco ASR9K",
+        " 2. Cisco CRS",
+        " 3. Cisco Catalyst 2960",
+        " 4. Cisco Catalyst 3850",
+        " 5. Cisco Catalyst 4500-X",
+        " 6. Cisco Catalyst 49xx",
+        " 7. Cisco Catalyst 65xx or 76xx",
+        " 8. Cisco Nexus 5xxx",
+        " 9. Cisco Nexus 7xxx",
+        "10. Cisco Nexus 93xx/95xx"
+    ]) + "\n")
+
+    equipment_choice = input("\nEnter your choice (1-10): ").strip()
+    device_file = DEVICE_FILES.get(equipment_choice)
+    if not device_file:
+        print("\nInvalid choice. Please enter a number between 1 and 10.")
+        logger.error("Invalid equipment type selected. Exiting.")
+        return None
+
+    # Validate command file
+    if not os.path.exists(device_file):
+        print(f"\nError: {device_file} not found.")
+        logger.error("Command file %s is missing. Exiting.", device_file)
+        return None
+
+    # Cisco CLI commands are plain ASCII; blank lines would only send empty commands
+    try:
+        with open(device_file, "r", encoding="ascii") as f:
+            commands = tuple(line for line in map(str.strip, f) if line)
+    except UnicodeDecodeError as e:
+        print(f"\nError: The file {device_file} contains non-ASCII characters. {e}")
+        logger.error("The file %s contains non-ASCII characters. Exiting.", device_file)
+        return None
+
+    if not commands:
+        print(f"\nError: The file {device_file} is empty or contains invalid commands.")
+        logger.error("The file %s is empty or improperly formatted. Exiting.", device_file)
+        return None
+
+    return device_file, commands
+
+def save_command_list(ticket_number, device_file, commands):
+    """
+    Store the pre-check command list in the ticket directory so the post-check runs the same commands.
+    """
+    path = os.path.join(ticket_number, COMMANDS_FILE)
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"device_file": device_file, "commands": list(commands)}, f, indent=2)
+        logger.info("Command list saved to %s.", path)
+    except OSError as e:
+        logger.warning("Failed to save command list to %s: %s", path, e)
+
+def load_command_list(ticket_number):
+    """
+    Return the (device_file, commands) saved by the pre-check, or None if there is no usable copy.
+    """
+    path = os.path.join(ticket_number, COMMANDS_FILE)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+        device_file, commands = saved["device_file"], tuple(saved["commands"])
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        logger.warning("Ignoring unreadable command list %s: %s", path, e)
+        return None
+    if device_file not in DEVICE_FILES.values() or not commands:
+        logger.warning("Ignoring invalid command list %s.", path)
+        return None
+    return device_file, commands
+
+def parse_args():
+    """
+    Parse command line options.
+    """
+    parser = argparse.ArgumentParser(description="Automated Pre and Post Health Check Script")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"Number of hosts to process in parallel (default: {DEFAULT_WORKERS})"
+    )
+    parser.add_argument(
+        "--shell",
+        action="store_true",
+        help="Always use an interactive shell, even for devices that support exec channels"
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="Send all shell commands in one batch instead of waiting for the prompt after each"
+    )
+    parser.add_argument(
+        "--bastion",
+        metavar="[USER@]HOST",
+        help="Reach all hosts through this jump host over a single shared SSH connection"
+    )
+    parser.add_argument(
+        "--max-output-kb",
+        type=int,
+        default=0,
+        metavar="KB",
+        help="Keep only the first and last KB kilobytes of larger command outputs, e.g. show tech (default: keep all)"
+    )
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="Log progress messages (INFO level) to the screen and healthcheck.log"
+    )
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.max_output_kb < 0:
+        parser.error("--max-output-kb cannot be negative")
+    return args
+
 def main():
-    print("\nAutomated Pre and Post Health Check Script")
-    print("=" * 80)
-    print("\nThis script requires the following files in the current directory:")
-    print('')
-    print("         -`hosts.txt`:             - List of hosts (one per line).")
-    print("         -`C_ASR9K.txt`:           - Cisco ASR9K")
-    print("         -`C-CRS.txt`:             - Cisco CRS")
-    print("         -`CC_2960.txt`:           - Cisco Catalyst 2960")
-    print("         -`CC_3850.txt`:           - Cisco Catalyst 3850")
-    print("         -`CC_4500-X.txt`:         - Cisco Catalyst 4500-X")
-    print("         -`CC_49xx.txt`:           - Cisco Catalyst 49xx")
-    print("         -`CC_65xx-76xx.txt`:      - Cisco Catalyst 65xx or 76xx")
-    print("         -`C-Nexus 5xxx.txt`:      - Cisco Nexus 5xxx")
-    print("         -`C-Nexus 7xxx.txt`:      - Cisco Nexus 7xxx")
-    print("         -`C-Nexus 93xx-95xx.txt`: - Cisco Nexus 93xx/95xx")
-    print('')
-    print("\nEnsure all required files are present before proceeding.\n")
-    print("=" * 80)
-    print('Please NOTE:')
-    print("=" * 80)
-    print('')
-    print("You can only use this for 'LIKE' devices, so ensure that hosts.txt only contains devices of a single 'type'")
-    print('Healththeck and Pre-check output files of all commands are written to individual files with `.pre` extension (bunch of individual files)')
-    print('Healthcheck and Post-check output files of all commands are written to individual files with `.post` extension (bunch of individual files)')
-    print('')
-    print("-" * 80)
-    print('Consolidated output of all commands for Healtcheck and Pre-check is written to a single file (for each device) with `.precheck` extension')
-    print('Consolidated output of all commands for Healtcheck and Post-check is written to a single file (for each device) with `.postcheck` extension')
-    print('')
-    print('Consolidated `diff` between Pre and Post Healthchecks as well as between Pre and Post checks is written to a file with `.out` extension (for each device)')
-    print("-" * 80)
-    print('')
-    print("=" * 80)
+    args = parse_args()
+    if args.verbose:
+        logger.setLevel(logging.INFO)
+
+    sys.stdout.write(_BANNER)
+
+    # Validate required files in one pass, before asking for anything.
+    # hosts.txt is mandatory; a missing command file only matters if it is selected later.
+    if not check_required_files(sorted(REQUIRED_FILES)) and not os.path.isfile("hosts.txt"):
+        logger.error("Required file hosts.txt is missing. Exiting.")
+        return
 
     # Ask for the ticket number and create the directory
     ticket_number = input("Please enter the ticket that you are working on (e.g., 'NAASOPS-xxxx'): ").strip()
@@ -227,22 +1055,13 @@ def main():
 
     # Create directory for the ticket
     try:
-        if not os.path.exists(ticket_number):
-            os.makedirs(ticket_number)
-        logger.info(f"Directory {ticket_number} created successfully.")
+        os.makedirs(ticket_number, exist_ok=True)
+        logger.info("Directory %s created successfully.", ticket_number)
     except OSError as e:
         print(f"\nError: Unable to create directory {ticket_number}. {e}")
-        logger.error(f"Failed to create directory {ticket_number}: {e}")
+        logger.error("Failed to create directory %s: %s", ticket_number, e)
         return
 
-    # Validate required files
-    required_files = ["hosts.txt"]
-    for file in required_files:
-        if not os.path.exists(file):
-            print(f"\nError: {file} is missing.")
-            logger.error(f"Required file {file} is missing. Exiting.")
-            return
-
     # Prompt for Pre or Post health check
     print("\nAre you performing a Pre or Post health check?")
     print('')
@@ -256,142 +1075,144 @@ def main():
         logger.error("Invalid health check type entered. Exiting.")
         return
 
-    # Equipment type selection
-    print("\nSelect the equipment type:")
-    print(" 1. Cisco ASR9K")
-    print(" 2. Cisco CRS")
-    print(" 3. Cisco Catalyst 2960")
-    print(" 4. Cisco Catalyst 3850")
-    print(" 5. Cisco Catalyst 4500-X")
-    print(" 6. Cisco Catalyst 49xx")
-    print(" 7. Cisco Catalyst 65xx or 76xx")
-    print(" 8. Cisco Nexus 5xxx")
-    print(" 9. Cisco Nexus 7xxx")
-    print("10. Cisco Nexus 93xx/95xx")
-
-    equipment_choice = input("\nEnter your choice (1-10): ").strip()
-    device_files = {
-        "1": "C-ASR9K.txt",
-        "2": "C-CRS.txt",
-        "3": "CC_2960.txt",
-        "4": "CC_3850.txt",
-        "5": "CC_4500-X.txt",
-        "6": "CC_49xx.txt",
-        "7": "CC_65xx-76xx.txt",
-        "8": "C-Nexus 5xxx.txt",
-        "9": "C-Nexus 7xxx.txt",
-        "10": "C-Nexus 93xx-95xx.txt"
-    }
-
-    device_file = device_files.get(equipment_choice)
-    if not device_file:
-        print("\nInvalid choice. Please enter a number between 1 and 10.")
-        logger.error("Invalid equipment type selected. Exiting.")
-        return
-
-    # Validate command file
-    if not os.path.exists(device_file):
-        print(f"\nError: {device_file} not found.")
-        logger.error(f"Command file {device_file} is missing. Exiting.")
-        return
-
-    with open(device_file, "r") as f:
-        commands = f.read().splitlines()
-
-    if not commands:
-        print(f"\nError: The file {device_file} is empty or contains invalid commands.")
-        logger.error(f"The file {device_file} is empty or improperly formatted. Exiting.")
-        return
+    # The post-check reuses the pre-check's command list so both runs pair up command for command
+    # (the directory may have been reused for another device type, so the user confirms it)
+    selection = load_command_list(ticket_number) if health_check_type == "post" else None
+    if selection:
+        print(f"\nThe pre-check for this ticket ran {len(selection[1])} commands from {selection[0]}.")
+        reuse = input("Use the same commands for the post-check? (Y/n): ").strip().lower()
+        if reuse not in ("", "y", "yes"):
+            selection = None
+    if not selection:
+        selection = select_commands()
+        if not selection:
+            return
+        if health_check_type == "pre":
+            save_command_list(ticket_number, *selection)
+    device_file, commands = selection
 
-    # Validate COMMAND_DELAY value
-    if COMMAND_DELAY < 0.1 or COMMAND_DELAY > 10:
-        logger.warning("COMMAND_DELAY is set to an unusual value. Adjust if necessary.")
+    # Validate COMMAND_TIMEOUT value
+    if COMMAND_TIMEOUT < 5 or COMMAND_TIMEOUT > 300:
+        logger.warning("COMMAND_TIMEOUT is set to an unusual value. Adjust if necessary.")
 
     # Read hosts from hosts.txt
+    # One strip per line; '#' lines are comments; duplicates are dropped (keeping the first)
+    # so two workers never write the same host's files at the same time
     with open("hosts.txt", "r") as hf:
-        hosts = [line.strip() for line in hf if line.strip()]
+        hosts = list(dict.fromkeys(line for line in map(str.strip, hf) if line and not line.startswith("#")))
 
     if not hosts:
         print("\nError: hosts.txt is empty or improperly formatted. Ensure one hostname or IP per line.")
         logger.error("hosts.txt is empty or improperly formatted. Exiting.")
         return
 
+    # Sanitize each command's filename once instead of per host and per diff
+    cmd_pairs = tuple((command, command.translate(COMMAND_SAFE_TABLE)) for command in commands)
+
+    use_exec = device_file in EXEC_DEVICE_FILES and not args.shell
+
     # SSH credentials
     username = input("\nEnter your SSH username: ").strip()
     password = getpass("Enter your SSH password: ")
 
+    # One connection to the jump host, shared by every worker
+    bastion = None
+    if args.bastion:
+        try:
+            bastion = connect_bastion(args.bastion, username, password)
+        except (paramiko.SSHException, OSError) as e:
+            print(f"\nError: Unable to connect to bastion {args.bastion}. {e}")
+            logger.error("Failed to connect to bastion %s: %s", args.bastion, e)
+            return
+    bastion_transport = bastion.get_transport() if bastion is not None else None
+
     # Process each host
     unreachable_hosts = []
     print("\nStarting health check for all hosts...\n")
     print("=" * 60)
 
-    for host in hosts:
-        print(f"\nProcessing host: {host}")
-        print(SEPARATOR)
-        error = ssh_command(host, username, password, commands, ticket_number, health_check_type)
-        if error:
-            logger.error(f"Could not process host {host}. Error: {error}")
-            unreachable_hosts.append(host)
+    # Resolve and probe every host up front, in parallel, so dead hosts fail in seconds instead of
+    # each taking a full connect timeout; through a bastion the far end does both
+    addresses = {}
+    ssh_hosts = hosts
+    if bastion is None:
+        with ThreadPoolExecutor(max_workers=min(PROBE_WORKERS, len(hosts))) as executor:
+            candidates = executor.map(resolve_host, hosts)
+            addresses = dict(zip(hosts, executor.map(first_open_address, candidates)))
+        ssh_hosts = [host for host in hosts if addresses[host]]
+        for host in hosts:
+            if not addresses[host]:
+                logger.error("Could not process host %s. Error: SSH port is not reachable.", host)
+                unreachable_hosts.append(host)
+
+    # Each host is handled by one worker, which gets its SSHClient from the connection pool
+    workers = min(args.workers, max(len(ssh_hosts), 1))
+    logger.info("Processing %s hosts with %s parallel workers.", len(ssh_hosts), workers)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(
+                ssh_command, host, username, password, cmd_pairs, ticket_number, health_check_type, use_exec,
+                args.pipeline, bastion_transport, args.max_output_kb * 1024, addresses.get(host)
+            ): host
+            for host in ssh_hosts
+        }
+        for future in as_completed(futures):
+            host = futures[future]
+            # Like gather(return_exceptions=True): one crashed worker must not abort the others
+            try:
+                error = future.result()
+            except Exception as e:
+                error = f"[ERROR] {e}"
+            if error:
+                logger.error("Could not process host %s. Error: %s", host, error)
+                unreachable_hosts.append(host)
+            else:
+                print(f"\nFinished host: {host}")
+                print(SEPARATOR)
+
+    # All commands have run; release the device vty lines before the (possibly long) diff phase
+    close_ssh_pool()
+    if bastion is not None:
+        bastion.close()
 
     # Post health check: Perform diff
     if health_check_type == "post":
         print("\nPerforming diff for post health check...\n")
-        for host in hosts:
-            diff_output_file = os.path.join(ticket_number, f"{host}.out")
-            with open(diff_output_file, "w") as diff_out:
-                logger.info(f"Starting diff for host {host}, output will be saved to {diff_output_file}")
-                for command in commands:
-                    command_safe = command.replace(' ', '_').replace('|', '').replace('/', '_')
-                    pre_file = os.path.join(ticket_number, f"{host}-{command_safe}.pre")
-                    post_file = os.path.join(ticket_number, f"{host}-{command_safe}.post")
-
-                    if not os.path.exists(pre_file):
-                        logger.warning(f"{pre_file} not found for {host}. Skipping diff.")
-                        diff_out.write(f"{command} - [WARNING] Pre file not found.\n{SEPARATOR}\n")
-                        continue
-
-                    if not os.path.exists(post_file):
-                        logger.warning(f"{post_file} not found for {host}. Skipping diff.")
-                        diff_out.write(f"{command} - [WARNING] Post file not found.\n{SEPARATOR}\n")
-                        continue
-
-                    with open(pre_file, "r") as pre, open(post_file, "r") as post:
-                        pre_lines = pre.readlines()
-                        post_lines = post.readlines()
-                        diff = difflib.unified_diff(pre_lines, post_lines, fromfile=pre_file, tofile=post_file)
-                        diff_output = "".join(diff)
-                        diff_out.write(f"Command: {command}\n")
-                        if diff_output:
-                            diff_out.write(diff_output)
-                        else:
-                            diff_out.write("[INFO] No differences detected.\n")
-                        diff_out.write(f"\n{SEPARATOR}\n")
-                logger.info(f"Diff results for host {host} saved to {diff_output_file}")
-
-    # Summary of processed hosts
-    print("\nSummary of Processed Hosts:")
-    print('')
+        # One directory scan for all hosts instead of two stat() calls per host and command
+        present_files = list_ticket_files(ticket_number)
+        # Hosts are independent; the work runs in diff child processes and C-level file compares, so threads overlap it
+        with ThreadPoolExecutor(max_workers=min(os.cpu_count() or 1, len(hosts))) as executor:
+            diff_futures = [
+                executor.submit(diff_host, host, cmd_pairs, ticket_number, present_files)
+                for host in hosts
+            ]
+            for future in diff_futures:
+                future.result()
+
+    # Report failures in hosts.txt order rather than completion order
+    host_order = {host: index for index, host in enumerate(hosts)}
+    unreachable_hosts.sort(key=host_order.get)
+
+    # Summary of processed hosts, built up front and written in a single call
     processed_count = len(hosts) - len(unreachable_hosts)
     failed_count = len(unreachable_hosts)
+    summary = ["", "Summary of Processed Hosts:", "", f" Processed {processed_count} hosts successfully."]
 
-    print(f" Processed {processed_count} hosts successfully.")
     if failed_count > 0:
-        print(f"    -Failed to process {failed_count} hosts:")
-        print('')
-        for host in unreachable_hosts:
-            print(f" - {host}")
+        summary += [f"    -Failed to process {failed_count} hosts:", ""]
+        summary += [f" - {host}" for host in unreachable_hosts]
         # Log unreachable hosts
-        logger.info(f"Failed to process {failed_count} hosts: {', '.join(unreachable_hosts)}")
+        logger.info("Failed to process %s hosts: %s", failed_count, ', '.join(unreachable_hosts))
     else:
-        print("    -No failures. All hosts were processed successfully.")
-        print('')
+        summary += ["    -No failures. All hosts were processed successfully.", ""]
         logger.info("All hosts were processed successfully.")
+    sys.stdout.write("\n".join(summary) + "\n")
 
     if health_check_type == "pre":
-        logger.info(f"Pre-check operation completed for all hosts. Outputs saved in {ticket_number} directory.")
+        logger.info("Pre-check operation completed for all hosts. Outputs saved in %s directory.", ticket_number)
 
     if health_check_type == "post":
-        logger.info(f"Post-check operation completed for all hosts. Diffs saved in {ticket_number} directory.")
+        logger.info("Post-check operation completed for all hosts. Diffs saved in %s directory.", ticket_number)
 
 if __name__ == "__main__":
     main()